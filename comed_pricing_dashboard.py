@@ -2,15 +2,39 @@
 
 import streamlit as st
 import requests
-import json
-from datetime import datetime, timedelta
-import pytz
+from requests.adapters import HTTPAdapter
+import orjson
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
 import plotly.graph_objects as go
+import plotly.io as pio
 import plotly.express as px
 from plotly.subplots import make_subplots
 import pandas as pd
 import numpy as np
 
+CHICAGO_TZ = ZoneInfo('America/Chicago')
+UTC = timezone.utc
+
+# Layout shared by every chart, merged onto plotly_white once per process
+CHART_TEMPLATE = 'comed'
+if CHART_TEMPLATE not in pio.templates:
+    pio.templates[CHART_TEMPLATE] = pio.templates.merge_templates('plotly_white', go.layout.Template(layout=dict(
+        title=dict(x=0.5, xanchor='center', font=dict(color='white')),
+        hovermode='x unified',
+        showlegend=False,
+        height=300,
+        margin=dict(l=50, r=50, t=50, b=50),
+        xaxis=dict(tickformat='%m/%d %H:%M', tickangle=45, tickmode='auto', nticks=10, type='date')
+    )))
+
+@st.cache_resource
+def get_session():
+    """Create one requests.Session shared across reruns, so the API connection is reused"""
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+    return session
+
 def fetch_comed_pricing_data():
     """Fetch 5-minute pricing data from ComEd API"""
     # Use dynamic dates - get data for the last 30 days
@@ -24,13 +48,13 @@ def fetch_comed_pricing_data():
     url = f"https://hourlypricing.comed.com/api?type=5minutefeed&datestart={start_str}&dateend={end_str}"
     
     try:
-        response = requests.get(url, timeout=30)
+        response = get_session().get(url, timeout=30)
         response.raise_for_status()
-        data = response.json()
+        data = orjson.loads(response.content)
         return data, None
     except requests.exceptions.RequestException as e:
         return None, f"Error fetching data: {e}"
-    except json.JSONDecodeError as e:
+    except orjson.JSONDecodeError as e:
         return None, f"Error parsing JSON response: {e}"
     except Exception as e:
         return None, f"Unexpected error: {e}"
@@ -43,7 +67,7 @@ def convert_to_chicago_time(timestamp_str):
             # Convert milliseconds to seconds and create datetime
             timestamp_seconds = int(timestamp_str) / 1000
             # Create UTC datetime directly to avoid system timezone issues
-            dt = datetime.utcfromtimestamp(timestamp_seconds).replace(tzinfo=pytz.utc)
+            dt = datetime.fromtimestamp(timestamp_seconds, tz=UTC)
         elif len(timestamp_str) == 14:  # Format: YYYYMMDDHHMMSS
             dt = datetime.strptime(timestamp_str, "%Y%m%d%H%M%S")
         elif len(timestamp_str) == 12:  # Format: YYYYMMDDHHMM
@@ -52,20 +76,27 @@ def convert_to_chicago_time(timestamp_str):
             # Try ISO format or other common formats
             dt = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
         
-        # Set timezone to Chicago
-        chicago_tz = pytz.timezone('America/Chicago')
-        
         # If the datetime is naive (no timezone), assume it's UTC
         if dt.tzinfo is None:
-            dt = pytz.utc.localize(dt)
+            dt = dt.replace(tzinfo=UTC)
         
         # Convert to Chicago time
-        chicago_time = dt.astimezone(chicago_tz)
+        chicago_time = dt.astimezone(CHICAGO_TZ)
         return chicago_time
     
     except Exception as e:
         return None
 
+def extract_millis_and_prices(items):
+    """Extract millisUTC timestamps and prices as NumPy arrays, or (None, None) if the items don't match"""
+    try:
+        millis = np.fromiter((int(item['millisUTC']) for item in items), dtype=np.int64, count=len(items))
+        prices = np.fromiter((float(item['price']) for item in items), dtype=np.float64, count=len(items))
+    except (KeyError, TypeError, ValueError):
+        return None, None
+    
+    return millis, prices
+
 def process_data_for_plotting(data):
     """Process API data into a format suitable for plotting"""
     if not data:
@@ -87,6 +118,25 @@ def process_data_for_plotting(data):
     else:
         return None, None, None, f"Unexpected data format: {type(data)}"
     
+    # Fast path: the ComEd feed is a list of millisUTC/price records
+    millis, prices = extract_millis_and_prices(items)
+    if millis is not None:
+        # Filter out invalid prices
+        valid = (prices >= 0) & (prices <= 1000)
+        millis, prices = millis[valid], prices[valid]
+        
+        if len(millis) == 0:
+            return None, None, None, f"No valid data points found. Processed {len(items)} items."
+        
+        # Sort by time, skipping the sort when the feed is already in order
+        if not np.all(np.diff(millis) >= 0):
+            order = np.argsort(millis, kind='stable')
+            millis, prices = millis[order], prices[order]
+        
+        # Convert the whole array to Chicago time at once
+        times = pd.to_datetime(millis, unit='ms', utc=True).tz_convert(CHICAGO_TZ)
+        return times, prices, len(items), None
+    
     # Extract times and prices
     times = []
     prices = []
@@ -114,12 +164,12 @@ def process_data_for_plotting(data):
                 except (ValueError, TypeError):
                     continue
         
-        if timestamp and price is not None:
+        # Filter out invalid prices before paying for timestamp parsing
+        if timestamp and price is not None and 0 <= price <= 1000:
             try:
                 chicago_time = convert_to_chicago_time(str(timestamp))
                 
-                # Filter out invalid prices
-                if chicago_time and 0 <= price <= 1000:
+                if chicago_time:
                     times.append(chicago_time)
                     prices.append(price)
             except (ValueError, KeyError, Exception):
@@ -129,60 +179,62 @@ def process_data_for_plotting(data):
         return None, None, None, f"No valid data points found. Processed {len(items)} items."
     
     # Sort by time
-    sorted_data = sorted(zip(times, prices))
-    times, prices = zip(*sorted_data)
+    times = pd.DatetimeIndex(times)
+    prices = np.asarray(prices, dtype=np.float64)
+    order = times.argsort(kind='stable')
+    times, prices = times[order], prices[order]
     
     return times, prices, len(items), None
 
-def create_weekly_chart(df, week_start, week_end, week_number, show_average=True, show_median=False):
-    """Create a chart for a specific week"""
-    # Filter data for this week
-    week_data = df[(df['Time'] >= week_start) & (df['Time'] <= week_end)]
+def add_reference_lines(fig, avg_price, median_price, show_average=True, show_median=False):
+    """Add average/median lines to a figure as plain layout shapes and annotations"""
+    shapes = []
+    annotations = []
     
-    if len(week_data) == 0:
-        return None, None
+    if show_average:
+        shapes.append(dict(type='line', xref='paper', x0=0, x1=1, y0=avg_price, y1=avg_price,
+                           line=dict(dash='dash', color='red')))
+        annotations.append(dict(xref='paper', x=1, xanchor='right', y=avg_price, yanchor='bottom',
+                                text=f"Avg: {avg_price:.1f}¢", showarrow=False))
+    
+    if show_median:
+        shapes.append(dict(type='line', xref='paper', x0=0, x1=1, y0=median_price, y1=median_price,
+                           line=dict(dash='dot', color='orange')))
+        annotations.append(dict(xref='paper', x=1, xanchor='right', y=median_price, yanchor='top',
+                                text=f"Med: {median_price:.1f}¢", showarrow=False))
     
+    fig.update_layout(shapes=shapes, annotations=annotations)
+
+def create_weekly_chart(week_data, week_start, week_end, week_number, show_average=True, show_median=False):
+    """Create a chart for a specific week"""
     if len(week_data) == 0:
         return None, None
     
     # Calculate statistics
-    avg_price = week_data['Price'].mean()
-    median_price = week_data['Price'].median()
-    min_price = week_data['Price'].min()
-    max_price = week_data['Price'].max()
+    week_prices = week_data['Price'].to_numpy()
+    avg_price = week_prices.mean()
+    median_price = np.median(week_prices) if show_median else None
+    min_price = week_prices.min()
+    max_price = week_prices.max()
+    
+    # Average into 30-minute points so the browser draws ~336 points instead of ~2016
+    plot_data = week_data.set_index('Time')['Price'].resample('30min').mean().reset_index()
     
     # Create the plot
     fig = go.Figure()
     
-    # Add the bars
-    fig.add_trace(go.Bar(
-        x=week_data['Time'],
-        y=week_data['Price'],
+    # Add the price line (WebGL)
+    fig.add_trace(go.Scattergl(
+        x=plot_data['Time'],
+        y=plot_data['Price'],
+        mode='lines',
         name='Price (cents)',
-        marker_color='#2E86AB',
-        opacity=0.7,
+        line=dict(color='#2E86AB', width=1),
         hovertemplate='<b>Time:</b> %{x}<br><b>Price:</b> %{y:.1f} cents<extra></extra>'
     ))
     
-    # Add average line if requested
-    if show_average:
-        fig.add_hline(
-            y=avg_price,
-            line_dash="dash",
-            line_color="red",
-            annotation_text=f"Avg: {avg_price:.1f}¢",
-            annotation_position="top right"
-        )
-    
-    # Add median line if requested
-    if show_median:
-        fig.add_hline(
-            y=median_price,
-            line_dash="dot",
-            line_color="orange",
-            annotation_text=f"Med: {median_price:.1f}¢",
-            annotation_position="bottom right"
-        )
+    # Add average/median lines if requested
+    add_reference_lines(fig, avg_price, median_price, show_average, show_median)
     
     # Format week range for title
     week_start_str = week_start.strftime("%m/%d")
@@ -190,29 +242,14 @@ def create_weekly_chart(df, week_start, week_end, week_number, show_average=True
     
     # Update layout
     fig.update_layout(
+        template=CHART_TEMPLATE,
         title={
             'text': f'Week {week_number}: {week_start_str} - {week_end_str} | Avg: {avg_price:.1f}¢',
-            'x': 0.5,
-            'xanchor': 'center',
-            'font': {'size': 16, 'color': 'white'}
+            'font': {'size': 16}
         },
         xaxis_title="",
-        yaxis_title="Price (cents)",
-        hovermode='x unified',
-        showlegend=False,
-        height=300,
-        template='plotly_white',
-        margin=dict(l=50, r=50, t=50, b=50)
-    )
-    
-    # Update x-axis formatting
-    fig.update_xaxes(
-        tickformat='%m/%d %H:%M',
-        tickangle=45,
-        tickmode='auto',
-        nticks=10,
-        range=[week_start, week_end],
-        type='date'
+        xaxis_range=[week_start, week_end],
+        yaxis_title="Price (cents)"
     )
     
     return fig, {
@@ -225,8 +262,7 @@ def create_weekly_chart(df, week_start, week_end, week_number, show_average=True
 
 def get_week_boundaries(end_date, num_weeks=5):
     """Get the start and end dates for the last N weeks (Sunday to Saturday)"""
-    chicago_tz = pytz.timezone('America/Chicago')
-    end_date = end_date.replace(tzinfo=chicago_tz)
+    end_date = end_date.replace(tzinfo=CHICAGO_TZ)
     
     # Find the most recent Sunday (start of week)
     days_since_sunday = (end_date.weekday() - 6) % 7
@@ -251,6 +287,48 @@ def get_week_boundaries(end_date, num_weeks=5):
     
     return weeks
 
+def slice_weeks(df, week_boundaries):
+    """Split a time-sorted DataFrame into one slice per (week_start, week_end) pair"""
+    # Use nanosecond resolution so microsecond week ends compare without rounding
+    times = pd.DatetimeIndex(df['Time']).as_unit('ns')
+    
+    # Convert the boundaries up front so searchsorted compares datetime64 arrays directly
+    week_starts = pd.DatetimeIndex([week_start for week_start, _ in week_boundaries]).as_unit('ns').tz_convert(times.tz)
+    week_ends = pd.DatetimeIndex([week_end for _, week_end in week_boundaries]).as_unit('ns').tz_convert(times.tz)
+    
+    starts = times.searchsorted(week_starts, side='left')
+    ends = times.searchsorted(week_ends, side='right')
+    return [df.iloc[lo:hi] for lo, hi in zip(starts, ends)]
+
+@st.cache_data(ttl=300)  # Cache for 5 minutes
+def load_pricing_dataframe():
+    """Fetch and process pricing data into a time-sorted DataFrame"""
+    data, error = fetch_comed_pricing_data()
+    if error:
+        return None, error, None
+    
+    times, prices, _, process_error = process_data_for_plotting(data)
+    if process_error:
+        return None, None, process_error
+    
+    # process_data_for_plotting already returns the data sorted by time
+    df = pd.DataFrame({
+        'Time': times,
+        'Price': prices
+    })
+    
+    return df, None, None
+
+@st.cache_data(ttl=300)  # Cache for 5 minutes
+def summarize_pricing_data(_df, last_time, week_boundaries):
+    """Slice recent and weekly data out of a time-sorted DataFrame, cached per latest timestamp"""
+    # Get the last 144 data points (12 hours), sorted by time (newest first)
+    recent_data = _df.iloc[::-1].head(144)
+    
+    week_slices = slice_weeks(_df, week_boundaries)
+    
+    return recent_data, week_slices
+
 def main():
     # Page configuration
     st.set_page_config(
@@ -303,180 +381,112 @@ def main():
     
     st.markdown("---")
     
-    # Fetch data with shorter cache time for more frequent updates
-    @st.cache_data(ttl=300)  # Cache for 5 minutes instead of 1 hour
-    def cached_fetch_data():
-        return fetch_comed_pricing_data()
-    
-    # Fetch data
+    # Fetch and process data
     with st.spinner("Loading pricing data..."):
-        data, error = cached_fetch_data()
+        df, error, process_error = load_pricing_dataframe()
+    
+    if process_error:
+        st.error(process_error)
+        return
     
     if error:
         st.error(f"Error fetching data: {error}")
         st.info("Showing sample data for demonstration purposes.")
         
         # Generate sample data for demonstration
-        end_time = datetime.now(pytz.timezone('America/Chicago'))
+        end_time = datetime.now(CHICAGO_TZ)
         start_time = end_time - timedelta(days=7)
         
         # Create sample data
-        sample_times = []
-        sample_prices = []
-        current_time = start_time
-        
-        while current_time <= end_time:
-            sample_times.append(current_time)
-            # Generate realistic price variations
-            base_price = 5.0
-            hourly_variation = 2.0 * np.sin(current_time.hour * np.pi / 12)  # Daily cycle
-            random_variation = np.random.normal(0, 1.0)
-            price = max(0, base_price + hourly_variation + random_variation)
-            sample_prices.append(price)
-            current_time += timedelta(minutes=5)
+        rng = np.random.default_rng()
+        times = pd.date_range(start_time, end_time, freq='5min')
         
-        times, prices = sample_times, sample_prices
-        total_points = len(sample_times)
-    else:
-        # Process real data
-        times, prices, total_points, process_error = process_data_for_plotting(data)
+        # Generate realistic price variations
+        base_price = 5.0
+        hours = times.hour.values.astype(np.float64)
+        hourly_variation = 2.0 * np.sin(hours * np.pi / 12)  # Daily cycle
+        random_variation = rng.standard_normal(len(times))
+        prices = np.maximum(0, base_price + hourly_variation + random_variation)
         
-        if process_error:
-            st.error(process_error)
-            return
-        
-        if not times or not prices:
-            st.error("No valid data points found")
-            return
-    
-    # Create DataFrame
-    df = pd.DataFrame({
-        'Time': times,
-        'Price': prices
-    })
+        df = pd.DataFrame({
+            'Time': times,
+            'Price': prices
+        })
     
     # Get week boundaries for the last 5 weeks
     week_boundaries = get_week_boundaries(datetime.now(), num_weeks=5)
     
-    # Calculate weekly statistics for sidebar comparison
-    weekly_stats = []
-    for i, (week_start, week_end) in enumerate(week_boundaries):
-        week_data = df[(df['Time'] >= week_start) & (df['Time'] <= week_end)]
-        
-        if len(week_data) > 0:
-            week_start_str = week_start.strftime("%m/%d")
-            week_end_str = week_end.strftime("%m/%d")
-            weekly_stats.append({
-                'week': f"Week {i+1}: {week_start_str}-{week_end_str}",
-                'avg_price': week_data['Price'].mean(),
-                'min_price': week_data['Price'].min(),
-                'max_price': week_data['Price'].max(),
-                'data_points': len(week_data)
-            })
-    
-
+    # Slice out recent and weekly data, reused until a newer data point arrives
+    # (df is never empty: load_pricing_dataframe reports an error instead, and the sample data spans 7 days)
+    recent_data, week_slices = summarize_pricing_data(df, df['Time'].iloc[-1], week_boundaries)
     
     # Recent Activity Section
     st.markdown("### 📈 Recent Activity")
     
-    if len(df) > 0:
-        # Get the last 144 data points (12 hours), sorted by time (newest first)
-        recent_data = df.sort_values('Time', ascending=False).head(144)
-        
-        # Create side-by-side layout
-        col1, col2 = st.columns([1, 1])
-        
-        with col1:
-            # Create bar chart for the same 144 data points
-            if len(recent_data) > 0:
-                # Sort by time for proper chart display (oldest to newest)
-                chart_data = recent_data.sort_values('Time', ascending=True)
-                
-                # Calculate average and median for the lines
-                avg_price = chart_data['Price'].mean()
-                median_price = chart_data['Price'].median()
-                
-                # Create the bar chart
-                fig = go.Figure()
-                
-                # Add bars
-                fig.add_trace(go.Bar(
-                    x=chart_data['Time'],
-                    y=chart_data['Price'],
-                    name='Price (cents)',
-                    marker_color='white',
-                    marker_line_color='#2E86AB',
-                    marker_line_width=1,
-                    opacity=1.0,
-                    hovertemplate='<b>Time:</b> %{x}<br><b>Price:</b> %{y:.1f} cents<extra></extra>'
-                ))
-                
-                # Add average line
-                if show_average:
-                    fig.add_hline(
-                        y=avg_price,
-                        line_dash="dash",
-                        line_color="red",
-                        annotation_text=f"Avg: {avg_price:.1f}¢",
-                        annotation_position="top right"
-                    )
-                
-                # Add median line
-                if show_median:
-                    fig.add_hline(
-                        y=median_price,
-                        line_dash="dot",
-                        line_color="orange",
-                        annotation_text=f"Med: {median_price:.1f}¢",
-                        annotation_position="bottom right"
-                    )
-                
-                # Update layout
-                fig.update_layout(
-                    title={
-                        'text': f'Last 12 Hours | Avg: {avg_price:.1f}¢',
-                        'x': 0.5,
-                        'xanchor': 'center',
-                        'font': {'size': 14, 'color': 'white'}
-                    },
-                    xaxis_title="Time",
-                    yaxis_title="Price (cents)",
-                    hovermode='x unified',
-                    showlegend=False,
-                    height=400,
-                    template='plotly_white',
-                    margin=dict(l=50, r=50, t=50, b=50)
-                )
-                
-                # Update x-axis formatting
-                fig.update_xaxes(
-                    tickformat='%m/%d %H:%M',
-                    tickangle=45,
-                    tickmode='auto',
-                    nticks=10
-                )
-                
-                st.plotly_chart(fig, use_container_width=True)
-        
-        with col2:
-            # Create table data
-            table_data = []
-            for _, row in recent_data.iterrows():
-                time_str = row['Time'].strftime('%m/%d %H:%M')
-                price_str = f"{row['Price']:.1f}¢"
-                table_data.append([time_str, price_str])
+    # Create side-by-side layout
+    col1, col2 = st.columns([1, 1])
+    
+    with col1:
+        # Create bar chart for the same 144 data points
+        if len(recent_data) > 0:
+            # Sort by time for proper chart display (oldest to newest)
+            chart_data = recent_data.sort_values('Time', ascending=True)
             
-            # Create DataFrame for table display
-            table_df = pd.DataFrame(table_data, columns=['Time', 'Price'])
-            st.dataframe(
-                table_df,
-                hide_index=True,
-                use_container_width=True,
-                column_config={
-                    "Time": st.column_config.TextColumn("Time", width="medium"),
-                    "Price": st.column_config.TextColumn("Price", width="small")
-                }
+            # Calculate average and median for the lines
+            avg_price = chart_data['Price'].mean()
+            median_price = chart_data['Price'].median() if show_median else None
+            
+            # Create the bar chart
+            fig = go.Figure()
+            
+            # Add bars
+            fig.add_trace(go.Bar(
+                x=chart_data['Time'],
+                y=chart_data['Price'],
+                name='Price (cents)',
+                marker_color='white',
+                marker_line_color='#2E86AB',
+                marker_line_width=1,
+                opacity=1.0,
+                hovertemplate='<b>Time:</b> %{x}<br><b>Price:</b> %{y:.1f} cents<extra></extra>'
+            ))
+            
+            # Add average/median lines
+            add_reference_lines(fig, avg_price, median_price, show_average, show_median)
+            
+            # Update layout
+            fig.update_layout(
+                template=CHART_TEMPLATE,
+                title={
+                    'text': f'Last 12 Hours | Avg: {avg_price:.1f}¢',
+                    'font': {'size': 14}
+                },
+                xaxis_title="Time",
+                yaxis_title="Price (cents)",
+                height=400
             )
+            
+            st.plotly_chart(fig, use_container_width=True)
+    
+    with col2:
+        # Format columns as NumPy string arrays
+        time_strs = recent_data['Time'].dt.strftime('%m/%d %H:%M').to_numpy(dtype=str)
+        price_strs = np.char.mod('%.1f¢', recent_data['Price'].to_numpy())
+        
+        # Create DataFrame for table display
+        table_df = pd.DataFrame({
+            'Time': time_strs,
+            'Price': price_strs
+        }, copy=False)
+        st.dataframe(
+            table_df,
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                "Time": st.column_config.TextColumn("Time", width="medium"),
+                "Price": st.column_config.TextColumn("Price", width="small")
+            }
+        )
     
     st.markdown("---")
     
@@ -486,20 +496,18 @@ def main():
     # Create and display weekly charts
     charts_created = 0
     
-    for i, (week_start, week_end) in enumerate(week_boundaries):
-        fig, stats = create_weekly_chart(df, week_start, week_end, i+1, show_average, show_median)
+    for i, ((week_start, week_end), week_data) in enumerate(zip(week_boundaries, week_slices)):
+        fig, stats = create_weekly_chart(week_data, week_start, week_end, i+1, show_average, show_median)
         
         if fig is not None:
             st.plotly_chart(fig, use_container_width=True)
             charts_created += 1
             
-            # Show data availability info for this week
-            week_data_debug = df[(df['Time'] >= week_start) & (df['Time'] <= week_end)]
-            if len(week_data_debug) > 0:
-                actual_start = week_data_debug['Time'].min()
-                actual_end = week_data_debug['Time'].max()
-                if actual_start.date() > week_start.date() or actual_end.date() < week_end.date():
-                    st.caption(f"Data available: {actual_start.strftime('%m/%d')} - {actual_end.strftime('%m/%d')} (partial week)")
+            # Show data availability info for this week (week_data is sorted by time)
+            actual_start = week_data['Time'].iloc[0]
+            actual_end = week_data['Time'].iloc[-1]
+            if actual_start.date() > week_start.date() or actual_end.date() < week_end.date():
+                st.caption(f"Data available: {actual_start.strftime('%m/%d')} - {actual_end.strftime('%m/%d')} (partial week)")
     
     # Footer
     st.markdown("---")